@@ -1,7 +1,9 @@
 from plinux.plinux import Plinux
 from plinux.plinux import ResponseParser
+from plinux.plinux import Job
 
 __all__ = [
     "Plinux",
     "ResponseParser",
+    "Job",
 ]
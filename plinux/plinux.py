@@ -1,8 +1,13 @@
+import base64
+import codecs
 import json
 import logging
 import os
 import platform
 import socket
+import threading
+import time
+import uuid
 from dataclasses import dataclass
 from subprocess import Popen, PIPE, TimeoutExpired
 from typing import Any
@@ -52,21 +57,54 @@ class ResponseParser:
         return json.loads(self.stdout)
 
 
+@dataclass()
+class Job:
+    """Handle of the command launched in background on remote host"""
+
+    id: str
+    directory: str
+    command: str = ''
+    sudo: bool = False
+    pid: int = 0
+    offset: int = 0
+    status: str = 'running'
+    exited: Any = None
+
+    @property
+    def running(self) -> bool:
+        return self.status == 'running'
+
+    @property
+    def ok(self) -> bool:
+        return self.exited == 0
+
+
 class Plinux:
     """Base class to work with linux"""
 
+    # Remote directory to store background jobs output, exit code and pid. Relative to the user's home directory
+    jobs_dir = '.plinux/jobs'
+
     def __init__(self,
                  host: str,
                  username: str,
                  password: str,
                  port: int = 22,
-                 logger_enabled: bool = True):
-        """Create a client object to work with linux host"""
+                 logger_enabled: bool = True,
+                 jump_host: 'Plinux' = None):
+        """Create a client object to work with linux host
+
+        :param jump_host: Bastion (Plinux object) to connect through. Its single SSH transport is shared by all
+            hosts behind it, each connection is a "direct-tcpip" channel within this transport.
+        """
 
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.jump_host = jump_host
+        self._transport_client = None
+        self._transport_lock = threading.Lock()
         logger.disabled = not logger_enabled
 
     def __str__(self):
@@ -82,6 +120,14 @@ class Plinux:
 
         # return self._client().get_transport().is_active()
         port_ = port or self.port
+
+        if self.jump_host:
+            try:
+                self._open_jump_channel(port_, timeout).close()
+                return True
+            except (ssh_exception.SSHException, OSError):
+                return False
+
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.settimeout(timeout)
             result = sock.connect_ex((self.host, port_))
@@ -115,6 +161,55 @@ class Plinux:
                 data = stdout + stderr
                 return data.decode()
 
+    @property
+    def transport(self):
+        """Persistent authenticated transport. Opened once and shared by the hosts use this one as a jump host"""
+
+        with self._transport_lock:
+            if self._transport_client is None or not self._transport_client.get_transport().is_active():
+                self._transport_client = self._client()
+                # Keep idle connection alive through NAT/firewall and detect silently dropped one
+                self._transport_client.get_transport().set_keepalive(30)
+            return self._transport_client.get_transport()
+
+    def _reset_transport(self, transport):
+        """Close persistent transport if it is still the specified (broken) one. Next usage reconnects"""
+
+        with self._transport_lock:
+            if self._transport_client is not None and self._transport_client.get_transport() is transport:
+                self._transport_client.close()
+                self._transport_client = None
+
+    def close(self):
+        """Close persistent transport (if opened)"""
+
+        with self._transport_lock:
+            if self._transport_client is not None:
+                self._transport_client.close()
+                self._transport_client = None
+
+    def _open_jump_channel(self, port: int = 0, timeout=15):
+        """Open "direct-tcpip" channel to the host through the jump host transport.
+
+        Jump host is reconnected once if its transport is broken (ChannelException means the host is unreachable).
+        """
+
+        destination = self.host, port or self.port
+        transport = self.jump_host.transport
+        try:
+            try:
+                return transport.open_channel('direct-tcpip', destination, ('127.0.0.1', 0), timeout=timeout)
+            except ssh_exception.ChannelException:
+                raise
+            except ssh_exception.SSHException as e:
+                logger.warning(f'Jump host {self.jump_host.host} connection is broken: {e}. Reconnecting')
+                self.jump_host._reset_transport(transport)
+                return self.jump_host.transport.open_channel(
+                    'direct-tcpip', destination, ('127.0.0.1', 0), timeout=timeout)
+        except ssh_exception.ChannelException as e:
+            logger.error(f'Cannot reach {self.host} through {self.jump_host.host}: {e.text}')
+            raise
+
     def _client(self, sftp=False, timeout=15):
         """http://www.paramiko.org/"""
 
@@ -122,7 +217,16 @@ class Plinux:
         client.set_missing_host_key_policy(AutoAddPolicy())
 
         try:
-            client.connect(self.host, username=self.username, password=self.password, timeout=timeout)
+            sock = self._open_jump_channel(timeout=timeout) if self.jump_host else None
+            try:
+                client.connect(self.host, port=self.port, username=self.username, password=self.password,
+                               timeout=timeout, sock=sock)
+            except Exception:
+                # Do not leave the channel opened within the shared jump host transport
+                client.close()
+                if sock:
+                    sock.close()
+                raise
 
             if sftp:
                 return client.open_sftp()
@@ -182,6 +286,12 @@ class Plinux:
         finally:
             client.close()
 
+    def _run_script(self, script: str, sudo: bool = False, timeout: int = 30) -> ResponseParser:
+        """Execute multiline shell script. It is passed base64 encoded to avoid quoting issues"""
+
+        encoded = base64.b64encode(script.encode()).decode()
+        return self.run_cmd(f'echo {encoded} | base64 -d | sh', sudo=sudo, timeout=timeout)
+
     @staticmethod
     def get_current_os_name():
         return platform.system()
@@ -242,6 +352,72 @@ class Plinux:
     def restart_service(self, name: str):
         return self.run_cmd(f'systemctl restart {name}', sudo=True)
 
+    def get_services_info(self, names: list) -> dict:
+        """Get state of several services using single "systemctl show" call
+
+        Usage: get_services_info(['sshd', 'cron']) -> {'sshd': {'ActiveState': 'active', ...}, ...}
+
+        :param names: List of services (units) names. Glob patterns are not supported
+        :return: dict {name: {ActiveState, SubState, UnitFileState, MainPID}}
+        """
+
+        if not names:
+            return {}
+        if any(char in name for name in names for char in '*?['):
+            raise ValueError(f'Glob patterns are not supported: {names}')
+
+        properties = 'ActiveState,SubState,UnitFileState,MainPID'
+        result = self.run_cmd(f'systemctl show -p {properties} {" ".join(names)}')
+        if not result.ok:
+            raise RuntimeError(f'Cannot get services info: {result.stderr}')
+
+        # systemctl prints one blank line separated block per unit in the order units were specified
+        blocks = result.stdout.split('\n\n') if result.stdout else []
+        if len(blocks) != len(names):
+            raise RuntimeError(f'Expected {len(names)} units info, got {len(blocks)}: {result.stdout}')
+
+        services = {}
+        for name, block in zip(names, blocks):
+            info = dict(line.split('=', 1) for line in block.splitlines() if '=' in line)
+            info['MainPID'] = int(info.get('MainPID') or 0)
+            services[name] = info
+        return services
+
+    def get_services_status(self, names: list) -> dict:
+        """Get several services status. {name: 'active'/'inactive'/'failed'...}"""
+
+        return {name: info.get('ActiveState') for name, info in self.get_services_info(names).items()}
+
+    def are_enabled(self, names: list) -> dict:
+        """Get several services enablement state. {name: 'enabled'/'disabled'/...}"""
+
+        return {name: info.get('UnitFileState') for name, info in self.get_services_info(names).items()}
+
+    def _control_services(self, action: str, names: list) -> dict:
+        """Execute single "systemctl <action>" for several services and get their status after
+
+        :param action: "start", "stop", "restart"
+        :param names: List of services (units) names
+        :return: dict {name: 'active'/'inactive'/'failed'...}. Check it to find out which unit failed
+        """
+
+        if not names:
+            raise ValueError('No services specified')
+
+        result = self.run_cmd(f'systemctl {action} {" ".join(names)}', sudo=True)
+        if not result.ok:
+            logger.error(f'systemctl {action} failed for some of {names}')
+        return self.get_services_status(names)
+
+    def stop_services(self, names: list) -> dict:
+        return self._control_services('stop', names)
+
+    def start_services(self, names: list) -> dict:
+        return self._control_services('start', names)
+
+    def restart_services(self, names: list) -> dict:
+        return self._control_services('restart', names)
+
     def get_service_journal(self, name: str):
         return self.run_cmd(f'journalctl -u {name}', sudo=True)
 
@@ -450,6 +626,209 @@ class Plinux:
     def get_processes(self):
         return self.run_cmd(f'ps -aux')
 
+    #  ----------- Background jobs -----------
+    # Shell function prints boot id and process start time (field 22 of /proc/<pid>/stat) to tell the job's
+    # process from another one got the same pid, i.e. after reboot
+    _proc_identity = 'identity() { echo "$(cat /proc/sys/kernel/random/boot_id) ' \
+                     '$(sed "s/.*) //" /proc/$1/stat 2>/dev/null | cut -d" " -f20)"; }\n'
+
+    def submit(self, cmd: str, sudo: bool = False) -> Job:
+        """Launch command detached on the remote host and return its handle immediately.
+
+        Output (stdout + stderr) is spooled to file, exit code is recorded after completion.
+        Job keeps running even if the SSH connection or the controller itself is gone.
+        Command is executed by the user's shell ($SHELL), "sh" if it is not set.
+
+        Usage:\n
+        job = client.submit('make -j8')\n
+        client.get_job_output(job)  # new output since the last call\n
+        client.wait_jobs([job])
+
+        :param cmd: Command to launch
+        :param sudo: Launch command as sudo user. Job files are owned by the user anyway
+        :return: Job
+        """
+
+        job_id = uuid.uuid4().hex[:12]
+        directory = f'{self.jobs_dir}/{job_id}'
+        encoded = base64.b64encode(cmd.encode()).decode()
+
+        # Job directory and files are always created by the user and accessible by the user only.
+        # Root (sudo) writes into the existing files, so their owner is kept.
+        # Restrictive umask is set in subshell, so the command itself is launched with the user's one.
+        prepare = (
+            '(\n'
+            'umask 077\n'
+            f'mkdir -p {self.jobs_dir} && [ ! -L {self.jobs_dir} ] && [ -O {self.jobs_dir} ] || exit 1\n'
+            f'chmod 700 {self.jobs_dir} && mkdir {directory} || exit 1\n'
+            f'echo {encoded} | base64 -d > {directory}/cmd\n'
+            f'touch {directory}/out {directory}/pid {directory}/proc {directory}/rc.tmp\n'
+            ') || exit 1\n'
+        )
+        launch = (
+            self._proc_identity +
+            f'cd {directory} || exit 1\n'
+            'shell=${SHELL:-sh}\n'
+            'setsid sh -c "$shell cmd; echo \\$? > rc.tmp; mv rc.tmp rc" > out 2>&1 < /dev/null &\n'
+            'echo $! > pid\n'
+            'identity $! > proc\n'
+            'echo $!\n'
+        )
+
+        if sudo:
+            result = self._run_script(prepare)
+            if result.ok:
+                result = self._run_script(launch, sudo=True)
+        else:
+            result = self._run_script(prepare + launch)
+
+        if not result.ok:
+            self.run_cmd(f'rm -rf {directory}')
+            raise RuntimeError(f'Cannot submit job: {result.stderr}')
+
+        job = Job(id=job_id, directory=directory, command=cmd, sudo=sudo, pid=int(result.stdout))
+        logger.info(f'Job {job.id} submitted. PID: {job.pid}')
+        return job
+
+    def get_job(self, job_id: str, sudo: bool = False) -> Job:
+        """Get handle of the previously submitted job. I.e. after controller restart
+
+        :param job_id: Job.id
+        :param sudo: Job was submitted as sudo user
+        :return: Job
+        """
+
+        job = Job(id=job_id, directory=f'{self.jobs_dir}/{job_id}', sudo=sudo)
+
+        client = self._client()
+        try:
+            with client.open_sftp() as sftp:
+                with sftp.open(f'{job.directory}/pid', 'rb') as file:
+                    pid = file.read().decode().strip()
+                with sftp.open(f'{job.directory}/cmd', 'rb') as file:
+                    job.command = file.read().decode()
+        finally:
+            client.close()
+
+        if not pid:
+            raise FileNotFoundError(f'Job {job_id} was not launched')
+
+        job.pid = int(pid)
+        return self.poll_jobs([job])[0]
+
+    def list_jobs(self):
+        """List ids of the jobs stored on the remote host"""
+
+        result = self.run_cmd(f'ls {self.jobs_dir}')
+        return result.stdout.split() if result.ok and result.stdout else []
+
+    def poll_jobs(self, jobs: list) -> list:
+        """Update status of several jobs using single SSH command.
+
+        Job.status: "running", "finished" (Job.exited contains exit code) or "lost" (process gone w/o exit code)
+
+        :param jobs: List of Job
+        :return: The same jobs updated
+        """
+
+        if not jobs:
+            return jobs
+
+        script = (
+            self._proc_identity +
+            f'for d in {" ".join(job.directory for job in jobs)}; do\n'
+            '  pid=$(cat $d/pid 2>/dev/null)\n'
+            '  if [ -f $d/rc ]; then echo "$(basename $d) $(cat $d/rc)"\n'
+            '  elif [ -n "$pid" ] && [ "$(identity $pid)" = "$(cat $d/proc 2>/dev/null)" ]; then\n'
+            '    echo "$(basename $d) running"\n'
+            # Check rc again: the job could complete between the first check and the process check
+            '  elif [ -f $d/rc ]; then echo "$(basename $d) $(cat $d/rc)"\n'
+            '  else echo "$(basename $d) lost"; fi\n'
+            'done\n'
+        )
+        result = self._run_script(script)
+        if not result.ok:
+            raise RuntimeError(f'Cannot poll jobs: {result.stderr}')
+
+        states = dict(line.split(' ', 1) for line in (result.stdout or '').splitlines())
+        for job in jobs:
+            state = states.get(job.id, 'lost')
+            if state in ('running', 'lost'):
+                job.status = state
+            else:
+                job.status = 'finished'
+                job.exited = int(state)
+        return jobs
+
+    def get_job_status(self, job: Job) -> str:
+        """Get job status. "running", "finished" or "lost" """
+        return self.poll_jobs([job])[0].status
+
+    def get_job_output(self, job: Job, offset: int = None, size: int = None) -> str:
+        """Get job output appeared since the offset.
+
+        Job.offset is moved to the end of the read data. Incomplete UTF-8 character at the end of the data
+        is not returned and is read next time.
+
+        :param job: Job
+        :param offset: Offset in bytes to read from. Job.offset by default (position of the previous read)
+        :param size: Maximum bytes to read. All available data by default
+        :return: Decoded output
+        """
+
+        offset_ = job.offset if offset is None else offset
+
+        client = self._client()
+        try:
+            with client.open_sftp() as sftp, sftp.open(f'{job.directory}/out', 'rb') as file:
+                file.seek(offset_)
+                data = file.read(size)
+        finally:
+            client.close()
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        text = decoder.decode(data)
+        pending = decoder.getstate()[0]
+
+        job.offset = offset_ + len(data) - len(pending)
+        return text
+
+    def wait_jobs(self, jobs: list, timeout: int = None, interval: int = 5) -> list:
+        """Wait until all jobs are completed
+
+        :param jobs: List of Job
+        :param timeout: Maximum time to wait in seconds. Wait infinitely by default
+        :param interval: Polling interval in seconds
+        :return: Jobs. Check Job.running to find out not completed ones in case of timeout
+        """
+
+        start = time.monotonic()
+        while True:
+            running = [job for job in jobs if job.running]
+            if not self.poll_jobs(running) or not any(job.running for job in running):
+                return jobs
+            if timeout is not None and time.monotonic() - start >= timeout:
+                logger.info(f'Timeout exceeded. Jobs still running: {[job.id for job in jobs if job.running]}')
+                return jobs
+            time.sleep(interval)
+
+    def cancel_job(self, job: Job):
+        """Kill the job and all its child processes"""
+
+        if job.pid <= 0:
+            raise ValueError(f'Job {job.id} PID is unknown. Use get_job() to restore the handle')
+
+        script = (
+            f'kill -TERM -{job.pid} 2>/dev/null || kill -TERM {job.pid}\n'
+            f'cd {job.directory} && [ ! -f rc ] && echo 143 > rc.tmp && mv rc.tmp rc\n'
+        )
+        self._run_script(script, sudo=job.sudo)
+        return self.poll_jobs([job])[0]
+
+    def remove_job(self, job: Job):
+        """Remove job's spooled output from the remote host"""
+        return self.run_cmd(f'rm -rf {job.directory}')
+
     #  ----------- Power management -----------
     def reboot(self):
         return self.run_cmd('shutdown -r now', sudo=True)
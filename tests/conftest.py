@@ -57,3 +57,72 @@ def response_cmd_remote(create_response_class):
 @pytest.fixture
 def response_cmd_remote_err(create_response_class):
     return create_response_class(positive=False)
+
+
+@pytest.fixture
+def response_systemctl_show():
+    return (
+        0,
+        'ActiveState=active\nSubState=running\nUnitFileState=enabled\nMainPID=812\n\n'
+        'ActiveState=inactive\nSubState=dead\nUnitFileState=disabled\nMainPID=0',
+        None,
+        'systemctl show -p ActiveState,SubState,UnitFileState,MainPID sshd cups'
+    )
+
+
+@pytest.fixture
+def response_poll_jobs():
+    return 0, 'a1 running\nb2 0\nc3 1', None, 'echo ... | base64 -d | sh'
+
+
+@pytest.fixture
+def mocked_client(monkeypatch):
+    """Plinux client with mocked run_cmd. Set its return_value/side_effect with ResponseParser"""
+
+    from unittest import mock
+
+    from plinux import Plinux
+
+    client = Plinux(host='127.0.0.1', username='bobby', password='qawsedrf', logger_enabled=False)
+    monkeypatch.setattr(client, 'run_cmd', mock.Mock())
+    return client
+
+
+@pytest.fixture
+def local_client(monkeypatch, tmp_path):
+    """Plinux client executes commands and reads files locally. Current directory is the user's home"""
+
+    import subprocess
+
+    from plinux import Plinux, ResponseParser
+
+    class SFTPClient:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        @staticmethod
+        def open(path, mode):
+            return open(path, mode)
+
+    class SSHClient:
+        @staticmethod
+        def open_sftp():
+            return SFTPClient()
+
+        def close(self):
+            pass
+
+    def run_cmd(cmd, sudo=False, timeout=30):
+        process = subprocess.run(cmd, shell=True, capture_output=True, timeout=timeout)
+        out = process.stdout.decode().strip() or None
+        err = process.stderr.decode().strip() or None
+        return ResponseParser((process.returncode, out, err, cmd))
+
+    monkeypatch.chdir(tmp_path)
+    client = Plinux(host='127.0.0.1', username='bobby', password='qawsedrf', logger_enabled=False)
+    monkeypatch.setattr(client, 'run_cmd', run_cmd)
+    monkeypatch.setattr(client, '_client', SSHClient)
+    return client
@@ -0,0 +1,13 @@
+from unittest import mock
+
+from plinux import Plinux
+
+
+class TestClient:
+    def test_custom_port(self):
+        client = Plinux(host='10.0.0.1', username='bobby', password='qawsedrf', port=2222, logger_enabled=False)
+
+        with mock.patch('plinux.plinux.SSHClient') as ssh_client:
+            client._client()
+
+        assert ssh_client.return_value.connect.call_args[1]['port'] == 2222, 'Port is not 2222'
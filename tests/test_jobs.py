@@ -0,0 +1,128 @@
+import os
+import signal
+
+import pytest
+
+from plinux import ResponseParser, Job
+
+
+class TestJobs:
+    def test_poll_jobs(self, mocked_client, response_poll_jobs):
+        mocked_client.run_cmd.return_value = ResponseParser(response_poll_jobs)
+
+        jobs = [Job(id=job_id, directory=f'.plinux/jobs/{job_id}') for job_id in ('a1', 'b2', 'c3', 'd4')]
+        a1, b2, c3, d4 = mocked_client.poll_jobs(jobs)
+        assert a1.running, 'Job must be running'
+        assert b2.status == 'finished' and b2.ok, 'Job must be finished successfully'
+        assert c3.status == 'finished' and c3.exited == 1, 'Exit code is not 1'
+        assert d4.status == 'lost', 'Job missed in response must be lost'
+
+    def test_poll_jobs_failed(self, mocked_client):
+        mocked_client.run_cmd.return_value = ResponseParser((255, None, 'Connection closed', 'echo ... | sh'))
+
+        job = Job(id='a1', directory='.plinux/jobs/a1')
+        with pytest.raises(RuntimeError):
+            mocked_client.wait_jobs([job])
+        assert job.running, 'Job status must not be changed'
+
+    def test_wait_jobs_timeout(self, mocked_client, response_poll_jobs):
+        mocked_client.run_cmd.return_value = ResponseParser(response_poll_jobs)
+
+        jobs = mocked_client.wait_jobs([Job(id='a1', directory='.plinux/jobs/a1')], timeout=0)
+        assert jobs[0].running, 'Job must be still running'
+
+    def test_submit(self, local_client):
+        job = local_client.submit('echo \'single \'"\'"\' "double" $HOME\'; exit 3')
+        local_client.wait_jobs([job], timeout=10, interval=0.1)
+
+        assert job.status == 'finished' and job.exited == 3, 'Exit code is not 3'
+        assert local_client.get_job_output(job) == 'single \' "double" $HOME\n', 'Wrong output'
+        assert local_client.get_job_output(job) == '', 'Output must be empty since the last read'
+        assert local_client.list_jobs() == [job.id], 'Job is not listed'
+
+    def test_submit_shell_and_umask(self, local_client, monkeypatch):
+        monkeypatch.setenv('SHELL', 'bash')
+        umask = os.umask(0o022)
+        try:
+            job = local_client.submit('[[ -n $BASH_VERSION ]] && umask')
+        finally:
+            os.umask(umask)
+        local_client.wait_jobs([job], timeout=10, interval=0.1)
+
+        assert local_client.get_job_output(job) == '0022\n', "Command must be run by $SHELL with the user's umask"
+
+    def test_submit_failed(self, local_client, monkeypatch):
+        run_cmd = local_client.run_cmd
+
+        def run_cmd_sudo_failed(cmd, sudo=False, timeout=30):
+            if sudo:
+                return ResponseParser((1, None, 'Sorry, try again.', cmd))
+            return run_cmd(cmd, sudo=sudo, timeout=timeout)
+
+        monkeypatch.setattr(local_client, 'run_cmd', run_cmd_sudo_failed)
+        with pytest.raises(RuntimeError):
+            local_client.submit('true', sudo=True)
+        assert local_client.list_jobs() == [], 'Directory of not launched job must be removed'
+
+    def test_submit_permissions(self, local_client):
+        job = local_client.submit('true')
+
+        assert os.stat(local_client.jobs_dir).st_mode & 0o777 == 0o700, 'Jobs directory is accessible by others'
+        for name in ('cmd', 'out', 'pid'):
+            assert os.stat(f'{job.directory}/{name}').st_mode & 0o077 == 0, f'"{name}" is accessible by others'
+
+    def test_submit_foreign_directory(self, local_client):
+        os.makedirs('.plinux')
+        os.symlink(os.getcwd(), local_client.jobs_dir)
+
+        with pytest.raises(RuntimeError):
+            local_client.submit('true')
+
+    def test_get_job(self, local_client):
+        submitted = local_client.submit('echo done')
+        local_client.wait_jobs([submitted], timeout=10, interval=0.1)
+
+        job = local_client.get_job(submitted.id)
+        assert job.pid == submitted.pid, 'Wrong PID'
+        assert job.command == 'echo done', 'Wrong command'
+        assert job.ok, 'Job must be finished successfully'
+
+        with pytest.raises(FileNotFoundError):
+            local_client.get_job('missing')
+
+        os.makedirs(f'{local_client.jobs_dir}/empty')
+        for name, content in (('pid', ''), ('cmd', 'true')):
+            with open(f'{local_client.jobs_dir}/empty/{name}', 'w') as file:
+                file.write(content)
+        with pytest.raises(FileNotFoundError):
+            local_client.get_job('empty')
+
+    def test_job_pid_reused(self, local_client):
+        job = local_client.submit('sleep 100')
+        try:
+            assert local_client.get_job_status(job) == 'running', 'Job must be running'
+            # Same pid, but another process (i.e. after reboot)
+            with open(f'{job.directory}/proc', 'w') as file:
+                file.write('another-boot-id 1\n')
+            assert local_client.get_job_status(job) == 'lost', 'Job must be lost'
+        finally:
+            os.killpg(job.pid, signal.SIGTERM)
+
+    def test_cancel_job(self, local_client):
+        job = local_client.submit('sleep 100')
+        local_client.cancel_job(job)
+
+        assert job.status == 'finished' and job.exited == 143, 'Job must be cancelled'
+
+        with pytest.raises(ValueError):
+            local_client.cancel_job(Job(id='a1', directory='.plinux/jobs/a1'))
+
+    def test_get_job_output_offset(self, local_client, tmp_path):
+        (tmp_path / 'out').write_bytes('ab€'.encode())  # euro sign is 3 bytes
+        job = Job(id='a1', directory=str(tmp_path))
+
+        assert local_client.get_job_output(job, size=3) == 'ab', 'Incomplete character must not be returned'
+        assert job.offset == 2, 'Offset must stay before the incomplete character'
+        assert local_client.get_job_output(job) == '€', 'Character must be returned by the next read'
+        assert job.offset == 5, 'Offset must be at the end of the file'
+        assert local_client.get_job_output(job, offset=0, size=1) == 'a', 'Wrong output from explicit offset'
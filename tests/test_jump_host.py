@@ -0,0 +1,65 @@
+from unittest import mock
+
+import pytest
+from paramiko import ssh_exception
+
+from plinux import Plinux
+
+
+class TestJumpHost:
+    def test_shared_transport(self):
+        bastion = Plinux(host='bastion.test.local', username='bobby', password='qawsedrf', logger_enabled=False)
+        hosts = [Plinux(host=f'10.0.0.{i}', username='bobby', password='qawsedrf', logger_enabled=False,
+                        jump_host=bastion) for i in (1, 2)]
+
+        with mock.patch('plinux.plinux.SSHClient') as ssh_client:
+            for host in hosts:
+                host._client()
+
+        transport = ssh_client.return_value.get_transport.return_value
+        assert transport.open_channel.call_count == 2, 'Channel must be opened for each host'
+        transport.open_channel.assert_called_with('direct-tcpip', ('10.0.0.2', 22), ('127.0.0.1', 0), timeout=15)
+
+        connects = ssh_client.return_value.connect.call_args_list
+        assert [args[0] for args, _ in connects] == ['bastion.test.local', '10.0.0.1', '10.0.0.2']
+        assert [kwargs['sock'] is None for _, kwargs in connects] == [True, False, False], \
+            'Bastion must be connected once directly, hosts through the channels'
+
+    def test_failed_connect_closes_channel(self):
+        bastion = Plinux(host='bastion.test.local', username='bobby', password='qawsedrf', logger_enabled=False)
+        host = Plinux(host='10.0.0.1', username='bobby', password='wrong', logger_enabled=False, jump_host=bastion)
+
+        with mock.patch('plinux.plinux.SSHClient') as ssh_client:
+            bastion.transport
+            ssh_client.return_value.connect.side_effect = ssh_exception.AuthenticationException
+            with pytest.raises(ssh_exception.AuthenticationException):
+                host._client()
+
+        channel = ssh_client.return_value.get_transport.return_value.open_channel.return_value
+        channel.close.assert_called_once()
+        ssh_client.return_value.close.assert_called_once()
+
+    def test_reconnect_broken_transport(self):
+        bastion = Plinux(host='bastion.test.local', username='bobby', password='qawsedrf', logger_enabled=False)
+        host = Plinux(host='10.0.0.1', username='bobby', password='qawsedrf', logger_enabled=False, jump_host=bastion)
+
+        with mock.patch('plinux.plinux.SSHClient') as ssh_client:
+            transport = ssh_client.return_value.get_transport.return_value
+            transport.open_channel.side_effect = [ssh_exception.SSHException('Unable to open channel.'), mock.Mock()]
+            host._client()
+
+        transport.set_keepalive.assert_called_with(30)
+        hosts = [args[0] for args, _ in ssh_client.return_value.connect.call_args_list]
+        assert hosts == ['bastion.test.local', 'bastion.test.local', '10.0.0.1'], 'Bastion must be reconnected once'
+
+    def test_unreachable_host_no_reconnect(self):
+        bastion = Plinux(host='bastion.test.local', username='bobby', password='qawsedrf', logger_enabled=False)
+        host = Plinux(host='10.0.0.1', username='bobby', password='qawsedrf', logger_enabled=False, jump_host=bastion)
+
+        with mock.patch('plinux.plinux.SSHClient') as ssh_client:
+            transport = ssh_client.return_value.get_transport.return_value
+            transport.open_channel.side_effect = ssh_exception.ChannelException(2, 'Connect failed')
+            with pytest.raises(ssh_exception.ChannelException):
+                host._client()
+
+        assert ssh_client.return_value.connect.call_count == 1, 'Bastion must not be reconnected'
@@ -0,0 +1,47 @@
+import pytest
+
+from plinux import ResponseParser
+
+
+class TestServices:
+    def test_services_info(self, mocked_client, response_systemctl_show):
+        mocked_client.run_cmd.return_value = ResponseParser(response_systemctl_show)
+
+        services = mocked_client.get_services_info(['sshd', 'cups'])
+        assert services['sshd'] == {'ActiveState': 'active', 'SubState': 'running',
+                                    'UnitFileState': 'enabled', 'MainPID': 812}, 'Wrong sshd info'
+        assert services['cups']['MainPID'] == 0, 'MainPID is not 0'
+
+    def test_services_status(self, mocked_client, response_systemctl_show):
+        mocked_client.run_cmd.return_value = ResponseParser(response_systemctl_show)
+
+        assert mocked_client.get_services_status(['sshd', 'cups']) == {'sshd': 'active', 'cups': 'inactive'}
+        assert mocked_client.are_enabled(['sshd', 'cups']) == {'sshd': 'enabled', 'cups': 'disabled'}
+
+    def test_services_info_mismatch(self, mocked_client, response_systemctl_show):
+        mocked_client.run_cmd.return_value = ResponseParser(response_systemctl_show)
+
+        with pytest.raises(RuntimeError):
+            mocked_client.get_services_info(['sshd', 'cups', 'cron'])
+
+    def test_services_info_failed(self, mocked_client):
+        response = 1, None, 'Unit name ssh@ is not valid.', 'systemctl show -p ActiveState ssh@'
+        mocked_client.run_cmd.return_value = ResponseParser(response)
+
+        with pytest.raises(RuntimeError):
+            mocked_client.get_services_info(['ssh@'])
+
+    def test_services_empty(self, mocked_client):
+        assert mocked_client.get_services_info([]) == {}, 'Empty names must return empty dict'
+        with pytest.raises(ValueError):
+            mocked_client.get_services_info(['ssh*'])
+        with pytest.raises(ValueError):
+            mocked_client.start_services([])
+        mocked_client.run_cmd.assert_not_called()
+
+    def test_control_services(self, mocked_client, response_systemctl_show):
+        response_start = 1, None, 'Job for cups.service failed.', 'systemctl start sshd cups'
+        mocked_client.run_cmd.side_effect = [ResponseParser(response_start), ResponseParser(response_systemctl_show)]
+
+        assert mocked_client.start_services(['sshd', 'cups']) == {'sshd': 'active', 'cups': 'inactive'}
+        assert mocked_client.run_cmd.call_count == 2, 'Must be one control and one status command'